@@ -1,12 +1,103 @@
 from board import Board
 from copy import deepcopy
 from random import choice
+from threading import Event, Thread
+import json
+import math
+import os
 import time
+import warnings
+
+STOP_CHECK_INTERVAL = 64 # Nodes searched between calls to the stop callback (the node limit is checked at every node)
+EVAL_CACHE_SIZE = 1 << 16 # Slots in the leaf evaluation cache, must be a power of two
+
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weights.json") # Written by tune.py
+FEATURES = ("man", "king", "center", "mobility")
+DEFAULT_WEIGHTS = {"man": 1, "king": 5, "center": 0.5, "mobility": 0.1}
+
+def load_weights(path=WEIGHTS_FILE):
+    # Returns the evaluation weights stored in a JSON file, or the default weights if the file doesn't exist.
+    # A file that can't be read, or that has unknown features or non-numeric weights, is ignored with a warning
+    # instead of raising, as this runs when the module is imported.
+    weights = dict(DEFAULT_WEIGHTS)
+
+    if not os.path.exists(path):
+        return weights
+
+    try:
+        with open(path) as weights_file:
+            stored_weights = json.load(weights_file)
+    except (OSError, ValueError) as error:
+        warnings.warn(f"Ignoring {path}, it can't be read: {error}")
+        return weights
+
+    if not isinstance(stored_weights, dict):
+        warnings.warn(f"Ignoring {path}, it should map feature names to weights")
+        return weights
+    unknown = set(stored_weights) - set(FEATURES)
+    if unknown:
+        warnings.warn(f"Ignoring {path}, it has unknown features: {', '.join(sorted(unknown))}")
+        return weights
+    for name, value in stored_weights.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            warnings.warn(f"Ignoring {path}, the weight of {name} is not a number: {value!r}")
+            return weights
+
+    weights.update(stored_weights)
+    return weights
+
+def get_features(board, color):
+    # Returns the evaluation features of a board as differences between color and its opponent:
+    # (men, kings, pieces in the center, possible moves).
+    men = 0
+    kings = 0
+    center = 0
+    mobility = 0
+
+    for piece in board.get_pieces():
+        sign = 1 if piece.get_color() == color else -1
+
+        if piece.is_king():
+            kings += sign
+        else:
+            men += sign
+
+        # Center bonus (rows 2-5, cols 2-5 are strategic)
+        row = board.get_row_number(int(piece.get_position()))
+        col = board.get_col_number(int(piece.get_position()))
+        if 2 <= row <= 5 and 2 <= col <= 5:
+            center += sign
+
+        mobility += sign * len(piece.get_moves(board))
+
+    return men, kings, center, mobility
+
+WEIGHTS = load_weights() # Loaded once at startup
+REVERSED_BYTES = [int(f"{byte:08b}"[::-1], 2) for byte in range(256)]
+
+class SearchStopped(Exception):
+    # Raised inside minimax to abandon a search that hit its node limit or was asked to stop.
+    pass
 
 class AI:
     def __init__(self, color, difficulty="medium"):
         self.color = color
         self.transposition_table = {}
+        self.node_limit = None # Maximum nodes per get_move call, or None for no limit
+        self.should_stop = None # Optional callable, returning True aborts the search in progress
+        self.nodes = 0 # Nodes searched by the current (or last) get_move call
+        self.can_stop = True # False while searching depth 1, which always completes so get_move never has to guess
+        self.use_eval_cache = True # Set to False to evaluate every leaf from scratch, e.g. for benchmarking
+        self.eval_cache = [None] * EVAL_CACHE_SIZE
+        self.weights = dict(WEIGHTS)
+        self.use_lmr = False # Late-move reductions, see search_child(). Off until matches show they don't cost strength
+        self.lmr_min_depth = 3 # Remaining depth needed before moves are reduced
+        self.lmr_move_threshold = 3 # Moves searched at full depth at each node before reductions start
+        self.lmr_reduction = 1 # Plies removed from reduced searches
+        self.ponder_forced_moves = False # After returning a single legal move at once, search the position it leads to in the background
+        self.ponder_thread = None
+        self.ponder_stop = Event() # Set to end the background search, see stop_ponder()
+        self.stats = {"searches": 0, "nodes": 0, "depth": 0, "score": None, "eval_probes": 0, "eval_hits": 0}
         
         # Set difficulty-based parameters
         if difficulty == "easy":
@@ -21,64 +112,115 @@ class AI:
 
     def minimax(self, current_board, is_maximizing, depth, turn, alpha=-float('inf'), beta=float('inf')):
         # Alpha-beta pruning added for efficiency
-        board_hash = self._hash_board(current_board)
-        key = (board_hash, depth, is_maximizing)
+        if self.can_stop and self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchStopped()
+        self.nodes += 1
+        if self.ponder_stop.is_set():
+            raise SearchStopped()
+        if self.can_stop and self.should_stop is not None and self.nodes % STOP_CHECK_INTERVAL == 0 and self.should_stop():
+            raise SearchStopped()
+
+        # A position and its color-flipped mirror share one entry, with values stored from the canonical White's point of view.
+        position_key, flipped = self._hash_board(current_board, turn)
+        key = (position_key, depth)
         if key in self.transposition_table:
-            return self.transposition_table[key]
+            return self._orient_value(self.transposition_table[key], flipped)
 
         if depth == 0 or current_board.get_winner() is not None:
+            if self.use_eval_cache:
+                # Leaves go to the eval cache, which is shared across depths, instead of the transposition table.
+                return self.get_cached_value(current_board, position_key, flipped)
             value = self.get_value(current_board)
-            self.transposition_table[key] = value
+            self.transposition_table[key] = self._orient_value(value, flipped)
             return value
 
         next_turn = 'B' if turn == 'W' else 'W'
         board_color_up = current_board.get_color_up()
         current_pieces = current_board.get_pieces()
-        piece_moves = list(map(lambda piece: piece.get_moves(current_board) if piece.get_color() == turn else False, current_pieces))
+        ordered_moves = self.order_moves(current_board, turn)
 
         if is_maximizing:
             maximum = -float('inf')
-            for index, moves in enumerate(piece_moves):
-                if moves == False:
-                    continue
-                for move in moves:
-                    aux_board = Board(deepcopy(current_pieces), board_color_up)
-                    aux_board.move_piece(index, int(move["position"]))
-                    eval = self.minimax(aux_board, False, depth - 1, next_turn, alpha, beta)
-                    maximum = max(maximum, eval)
-                    alpha = max(alpha, eval)
-                    if beta <= alpha:
-                        break  # Prune
-            self.transposition_table[key] = maximum
+            # move_number counts the moves searched so far at this node, for late-move reductions
+            for move_number, (index, move) in enumerate(ordered_moves):
+                aux_board = Board(deepcopy(current_pieces), board_color_up)
+                aux_board.move_piece(index, int(move["position"]))
+                eval = self.search_child(aux_board, False, depth, next_turn, alpha, beta, move, move_number)
+                maximum = max(maximum, eval)
+                alpha = max(alpha, eval)
+                if beta <= alpha:
+                    break  # Prune
+            self.transposition_table[key] = self._orient_value(maximum, flipped)
             return maximum
         else:
             minimum = float('inf')
-            for index, moves in enumerate(piece_moves):
-                if moves == False:
-                    continue
-                for move in moves:
-                    aux_board = Board(deepcopy(current_pieces), board_color_up)
-                    aux_board.move_piece(index, int(move["position"]))
-                    eval = self.minimax(aux_board, True, depth - 1, next_turn, alpha, beta)
-                    minimum = min(minimum, eval)
-                    beta = min(beta, eval)
-                    if beta <= alpha:
-                        break  # Prune
-            self.transposition_table[key] = minimum
+            for move_number, (index, move) in enumerate(ordered_moves):
+                aux_board = Board(deepcopy(current_pieces), board_color_up)
+                aux_board.move_piece(index, int(move["position"]))
+                eval = self.search_child(aux_board, True, depth, next_turn, alpha, beta, move, move_number)
+                minimum = min(minimum, eval)
+                beta = min(beta, eval)
+                if beta <= alpha:
+                    break  # Prune
+            self.transposition_table[key] = self._orient_value(minimum, flipped)
             return minimum
 
-    def get_move(self, current_board):
+    def order_moves(self, board, turn):
+        # Returns the (piece index, move) pairs available to turn, most promising first so alpha-beta cuts off sooner
+        # and late-move reductions only reduce the unlikely moves: captures, then promotions, then moves to the center.
+        ordered_moves = []
+
+        for index, piece in enumerate(board.get_pieces()):
+            if piece.get_color() != turn:
+                continue
+            king_row = 0 if piece.get_color() == board.get_color_up() else 7
+            for move in piece.get_moves(board):
+                position_to = int(move["position"])
+                row = board.get_row_number(position_to)
+                if move["eats_piece"]:
+                    priority = 3
+                elif not piece.is_king() and row == king_row:
+                    priority = 2
+                elif 2 <= row <= 5 and 2 <= board.get_col_number(position_to) <= 5:
+                    priority = 1
+                else:
+                    priority = 0
+                ordered_moves.append((priority, index, move))
+
+        # The sort is stable, so moves of equal priority keep their generation order.
+        ordered_moves.sort(key=lambda entry: -entry[0])
+        return [(index, move) for _, index, move in ordered_moves]
+
+    def search_child(self, board, is_maximizing, depth, turn, alpha, beta, move, move_number):
+        # Searches a child node with depth - 1 remaining, applying late-move reductions:
+        # quiet moves searched late at a node are tried at a reduced depth first, and only searched again
+        # at full depth if the reduced result beats the current bound.
+        if self.use_lmr and depth >= self.lmr_min_depth and move_number >= self.lmr_move_threshold and not move["eats_piece"]:
+            eval = self.minimax(board, is_maximizing, depth - 1 - self.lmr_reduction, turn, alpha, beta)
+            # The child maximizes when this node minimizes, in which case beating the bound means going below beta.
+            beats_bound = eval < beta if is_maximizing else eval > alpha
+            if not beats_bound:
+                return eval
+
+        return self.minimax(board, is_maximizing, depth - 1, turn, alpha, beta)
+
+    def get_move(self, current_board, piece_position=None):
         # Iterative deepening with time limit for responsiveness
+        # piece_position restricts the search to the piece on that position, for continuing a multi-jump.
         board_color_up = current_board.get_color_up()
         current_pieces = current_board.get_pieces()
         next_turn = "W" if self.color == "B" else "B"
         player_pieces = list(map(lambda piece: piece if piece.get_color() == self.color else False, current_pieces))
         possible_moves = []
+        self.stop_ponder()
         start_time = time.time()
+        self.nodes = 0
 
         for index, piece in enumerate(player_pieces):
             if piece == False:
                 continue
+            if piece_position is not None and piece.get_position() != str(piece_position):
+                continue
             for move in piece.get_moves(current_board):
                 possible_moves.append({"piece": index, "move": move})
 
@@ -91,69 +233,143 @@ class AI:
         if not possible_moves:
             return None
 
+        # A single legal move (usually a forced capture) doesn't need a search.
+        if len(possible_moves) == 1:
+            self.stats["searches"] += 1
+            self.stats["depth"] = 0
+            self.stats["score"] = None
+            only_move = possible_moves[0]
+            if self.ponder_forced_moves:
+                aux_board = Board(deepcopy(current_pieces), board_color_up)
+                aux_board.move_piece(only_move["piece"], int(only_move["move"]["position"]))
+                self.start_ponder(aux_board, next_turn)
+            return {"position_to": only_move["move"]["position"], "position_from": player_pieces[only_move["piece"]].get_position()}
+
         best_move = None
         best_score = -float('inf')
+        best_depth = 0
 
         # Iterative deepening: try depths 1 to self.max_depth, but stop if time > self.time_limit
+        # Depth 1 ignores the limits, so there is always a searched move to return.
         for depth in range(1, self.max_depth + 1):  
-            if time.time() - start_time > self.time_limit:  
+            if depth > 1 and time.time() - start_time > self.time_limit:  
                 break
+            self.can_stop = depth > 1
             current_best_score = -float('inf')
             current_best_move = None
-            for move in possible_moves:
-                aux_board = Board(deepcopy(current_pieces), board_color_up)
-                aux_board.move_piece(move["piece"], int(move["move"]["position"]))
-                score = self.minimax(aux_board, False, depth, next_turn)
-                if score > current_best_score:
-                    current_best_score = score
-                    current_best_move = move
+            try:
+                for move in possible_moves:
+                    aux_board = Board(deepcopy(current_pieces), board_color_up)
+                    aux_board.move_piece(move["piece"], int(move["move"]["position"]))
+                    score = self.minimax(aux_board, False, depth, next_turn)
+                    if score > current_best_score:
+                        current_best_score = score
+                        current_best_move = move
+            except SearchStopped:
+                # Keep the result of the last depth that was searched completely.
+                break
             if current_best_move:
                 best_move = current_best_move
                 best_score = current_best_score
+                best_depth = depth
+
+        self.can_stop = True
 
         if not best_move:
             # Fallback to random if no move found (rare)
             best_move = choice(possible_moves)
 
+        self.stats["searches"] += 1
+        self.stats["nodes"] += self.nodes
+        self.stats["depth"] = best_depth
+        self.stats["score"] = best_score if best_depth else None
+
         return {"position_to": best_move["move"]["position"], "position_from": player_pieces[best_move["piece"]].get_position()}
 
+    def get_cached_value(self, board, position_key, flipped):
+        # Direct-mapped cache: each position hash has a single slot, and a colliding position simply replaces it.
+        # Like the transposition table, values are stored from the canonical White's point of view.
+        position_hash = hash(position_key)
+        slot = position_hash & (EVAL_CACHE_SIZE - 1)
+        entry = self.eval_cache[slot]
+        self.stats["eval_probes"] += 1
+
+        if entry is not None and entry[0] == position_hash:
+            self.stats["eval_hits"] += 1
+            return self._orient_value(entry[1], flipped)
+
+        value = self.get_value(board)
+        self.eval_cache[slot] = (position_hash, self._orient_value(value, flipped))
+        return value
+
     def get_value(self, board):
         # Enhanced evaluation: considers wins, piece counts, kings, positions, and mobility
-        board_pieces = board.get_pieces()
         winner = board.get_winner()
 
         if winner is not None:
             return 100 if winner == self.color else -100  # Strong win/loss bonus
 
-        score = 0
-        player_pieces = [p for p in board_pieces if p.get_color() == self.color]
-        opponent_pieces = [p for p in board_pieces if p.get_color() != self.color]
-
-        # Piece count and king bonus
-        for piece in player_pieces:
-            value = 5 if piece.is_king() else 1
-            score += value
-            # Center bonus (rows 2-5, cols 2-5 are strategic)
-            row = board.get_row_number(int(piece.get_position()))
-            col = board.get_col_number(int(piece.get_position()))
-            if 2 <= row <= 5 and 2 <= col <= 5:
-                score += 0.5
-        for piece in opponent_pieces:
-            value = 5 if piece.is_king() else 1
-            score -= value
-            row = board.get_row_number(int(piece.get_position()))
-            col = board.get_col_number(int(piece.get_position()))
-            if 2 <= row <= 5 and 2 <= col <= 5:
-                score -= 0.5
-
-        # Mobility bonus: number of possible moves
-        player_moves = sum(len(p.get_moves(board)) for p in player_pieces)
-        opponent_moves = sum(len(p.get_moves(board)) for p in opponent_pieces)
-        score += 0.1 * player_moves
-        score -= 0.1 * opponent_moves
-
-        return score
-
-    def _hash_board(self, board):
-        # Simple hash for transposition: tuple of piece names (includes position, color, king status)
-        return tuple(piece.get_name() for piece in board.get_pieces())
\ No newline at end of file
+        # Weighted sum of the features, see get_features() and tune.py
+        return sum(self.weights[name] * value for name, value in zip(FEATURES, get_features(board, self.color)))
+
+    def start_ponder(self, board, turn):
+        # Searches board (with turn to move) on a background thread, for up to max_depth and time_limit, only to fill
+        # the transposition table and eval cache for the next get_move call, which stops it first.
+        def ponder():
+            start_time = time.time()
+            self.nodes = 0
+            self.can_stop = True
+            try:
+                for depth in range(1, self.max_depth + 1):
+                    if time.time() - start_time > self.time_limit:
+                        break
+                    self.minimax(board, False, depth, turn)
+            except SearchStopped:
+                pass
+
+        self.ponder_thread = Thread(target=ponder, daemon=True)
+        self.ponder_thread.start()
+
+    def stop_ponder(self):
+        # Ends the background search started by start_ponder(), if any, and waits for it.
+        if self.ponder_thread is None:
+            return
+        self.ponder_stop.set()
+        self.ponder_thread.join()
+        self.ponder_thread = None
+        self.ponder_stop.clear()
+
+    def share_caches(self, other):
+        # Uses another AI's transposition table and eval cache. Their entries don't depend on the AI's color,
+        # so the AIs for both colors (with the same weights) can share them.
+        self.transposition_table = other.transposition_table
+        self.eval_cache = other.eval_cache
+
+    def _orient_value(self, value, flipped):
+        # Converts between this AI's point of view and the canonical White's, in either direction.
+        # This relies on the evaluation being antisymmetric, i.e. a position is worth -x to one color if it's worth x to the other.
+        point_of_view = self.color if not flipped else ("B" if self.color == "W" else "W")
+        return value if point_of_view == "W" else -value
+
+    def _hash_board(self, board, turn):
+        # Returns (key, flipped) for the position with turn to move. The key is the smaller of the position's masks and
+        # those of its mirror (rotated 180 degrees with colors swapped), and flipped is True if the mirror was used.
+        occupied, white, kings = board.get_masks()
+        key = (occupied, white, kings, turn == "B", board.get_color_up() == "B")
+
+        # Rotating swaps which color moves up, and swapping colors swaps it back, so color_up stays the same.
+        flipped_occupied = _reverse_bits(occupied)
+        flipped_white = _reverse_bits(occupied & ~white)
+        flipped_key = (flipped_occupied, flipped_white, _reverse_bits(kings), turn == "W", board.get_color_up() == "B")
+
+        return (flipped_key, True) if flipped_key < key else (key, False)
+
+def make_ai_players(difficulty="medium"):
+    # Returns {"W": AI, "B": AI} sharing one transposition table and eval cache, see AI.share_caches().
+    ai_players = {"W": AI("W", difficulty), "B": AI("B", difficulty)}
+    ai_players["B"].share_caches(ai_players["W"])
+    return ai_players
+
+def _reverse_bits(mask):
+    # Reverses a 32 bit mask, which maps every position n to 31 - n (a 180 degree rotation of the board).
+    return (REVERSED_BYTES[mask & 0xFF] << 24) | (REVERSED_BYTES[(mask >> 8) & 0xFF] << 16) | (REVERSED_BYTES[(mask >> 16) & 0xFF] << 8) | REVERSED_BYTES[mask >> 24]
\ No newline at end of file
@@ -0,0 +1,104 @@
+from board import Board
+from ai import make_ai_players
+from pdn import PDN_COLORS, read_games, replay_game, format_move, apply_move, ai_move_to_hop
+from utils import batched
+from copy import deepcopy
+from multiprocessing import Pool
+import argparse
+import json
+import os
+import sys
+
+# Replays PDN game records and evaluates every move with the AI at a fixed search depth.
+# Writes one JSON line per move with the AI's score for the played and best moves, flagging blunders.
+# Usage: python analyse.py games.pdn analysis.jsonl --depth 4
+
+BLUNDER_THRESHOLD = 1.0 # Score lost compared to the best move, where a man is worth 1
+BATCH_GAMES_PER_WORKER = 8 # Games handed to the pool at once, keeping memory constant for huge archives
+
+def score_move(ai, board, turn, move, depth):
+    # Scores a single piece movement (a move dictionary with a two-position path) the same way AI.get_move scores its candidates.
+    aux_board = Board(deepcopy(board.get_pieces()), board.get_color_up())
+    apply_move(aux_board, move, turn)
+    next_turn = "B" if turn == "W" else "W"
+    return ai.minimax(aux_board, False, depth, next_turn)
+
+def analyse_game(job):
+    # Receives a (game_number, game, depth, blunder_threshold) tuple, returns (evaluations, error).
+    # A game that can't be read or replayed has no evaluations and error is the reason, otherwise error is None.
+    game_number, game, depth, blunder_threshold = job
+    try:
+        return analyse_moves(game_number, game, depth, blunder_threshold), None
+    except ValueError as error:
+        return [], str(error)
+
+def analyse_moves(game_number, game, depth, blunder_threshold):
+    # Returns a list of per-move evaluations of a game record.
+    ai_players = make_ai_players()
+    evaluations = []
+
+    for ai in ai_players.values():
+        ai.max_depth = depth
+        ai.time_limit = float("inf")
+
+    for ply, (board, turn, move) in enumerate(replay_game(game)):
+        ai = ai_players[turn]
+
+        best_move = ai.get_move(board)
+        if best_move is None:
+            break
+
+        # The AI searches one jump at a time, so only the first jump of the played move is compared.
+        best_hop = ai_move_to_hop(board, best_move)
+        played_hop = {"path": move["path"][:2], "captures": move["captures"]}
+        best_score = score_move(ai, board, turn, best_hop, depth)
+        played_score = best_score if played_hop == best_hop else score_move(ai, board, turn, played_hop, depth)
+        loss = best_score - played_score
+
+        evaluations.append({
+            "game": game_number,
+            "ply": ply + 1,
+            "side": PDN_COLORS[turn],
+            "move": format_move(move),
+            "best": format_move(best_hop),
+            "score": best_score,
+            "played_score": played_score,
+            "loss": loss,
+            "blunder": loss >= blunder_threshold,
+        })
+
+    return evaluations
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate every move of a PDN archive with the AI.")
+    parser.add_argument("games", help="PDN file to analyse")
+    parser.add_argument("out", help="JSON lines file to write the evaluations to")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--blunder", type=float, default=BLUNDER_THRESHOLD, help="score loss that counts as a blunder")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count()
+
+    with Pool(workers) as pool, open(args.games) as games_file, open(args.out, "w") as out_file:
+        jobs = ((game_number, game, args.depth, args.blunder) for game_number, game in enumerate(read_games(games_file), 1))
+        batch_size = BATCH_GAMES_PER_WORKER * workers
+        games_done = 0
+        blunders = 0
+        games_skipped = 0
+
+        for batch in batched(jobs, batch_size):
+            for (game_number, *_), (evaluations, error) in zip(batch, pool.imap(analyse_game, batch)):
+                if error is not None:
+                    print(f"Skipped game {game_number}: {error}", file=sys.stderr)
+                    games_skipped += 1
+                    continue
+                for evaluation in evaluations:
+                    out_file.write(json.dumps(evaluation) + "\n")
+                    blunders += evaluation["blunder"]
+                games_done += 1
+            out_file.flush()
+            print(f"Analysed {games_done} games, {blunders} blunders found, {games_skipped} games skipped")
+
+if __name__ == '__main__':
+    main()
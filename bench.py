@@ -0,0 +1,68 @@
+from ai import AI
+from pdn import fen_to_board, format_move, ai_move_to_hop
+import argparse
+import time
+
+# Searches a fixed set of positions at a fixed depth and reports nodes, time and cache statistics.
+# Used to compare search changes, e.g. python bench.py --depth 4 versus python bench.py --depth 4 --lmr
+
+BENCHMARK_POSITIONS = [
+    "B:W21,22,23,24,25,26,27,28,29,30,31,32:B1,2,3,4,5,6,7,8,9,10,11,12",
+    "B:W19,21,22,23,25,27,28,29,30,31,32:B1,2,3,4,6,7,8,11,14,15,16",
+    "W:W12,19,21,22,25,27,29,30,31,32:B1,2,3,4,6,8,11,14,15",
+    "B:W12,21,22,23,25,29,30,31,32:B1,2,3,4,8,11,14,15",
+    "W:W12,22,23,30,31,32:B4,10,11,13,15",
+    "B:W18,21,22,24,25,27,28,29,30,31,32:B1,2,3,4,5,8,10,11,12,14,15",
+    "W:W21,22,24,25,28,29,30,31,32:B1,2,3,4,8,11,12,14,15",
+    "B:WK14,18,21,26,29,31,32:B2,4,6",
+    "W:W12,20,21,23,26,29,30,31,32:B1,2,3,4,6,7,8,14",
+    "B:W12,16,25,30,31,32:B2,3,4,8,10,21",
+    "W:W12,22,30,31,32:B3,4,11,14,21",
+    "B:W7,8,13,30,31,32:B4,11",
+]
+
+def make_ai(color, args):
+    ai = AI(color)
+    ai.max_depth = args.depth
+    ai.time_limit = float("inf")
+    ai.use_eval_cache = not args.no_eval_cache
+    ai.use_lmr = args.lmr
+    ai.lmr_min_depth = args.lmr_depth
+    ai.lmr_move_threshold = args.lmr_moves
+    ai.lmr_reduction = args.lmr_reduction
+    return ai
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AI search on a fixed set of positions.")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--no-eval-cache", action="store_true", help="evaluate every leaf from scratch")
+    parser.add_argument("--lmr", action="store_true", help="enable late-move reductions")
+    parser.add_argument("--lmr-depth", type=int, default=3, help="remaining depth needed to reduce a move")
+    parser.add_argument("--lmr-moves", type=int, default=3, help="moves searched at full depth before reducing")
+    parser.add_argument("--lmr-reduction", type=int, default=1)
+    args = parser.parse_args()
+
+    total_nodes = 0
+    total_time = 0
+    eval_probes = 0
+    eval_hits = 0
+
+    for number, fen in enumerate(BENCHMARK_POSITIONS, 1):
+        board, turn = fen_to_board(fen)
+        ai = make_ai(turn, args)
+        start_time = time.perf_counter()
+        move = ai.get_move(board)
+        elapsed = time.perf_counter() - start_time
+
+        total_nodes += ai.nodes
+        total_time += elapsed
+        eval_probes += ai.stats["eval_probes"]
+        eval_hits += ai.stats["eval_hits"]
+        best = "none" if move is None else format_move(ai_move_to_hop(board, move))
+        print(f"{number:2}. {best:>6} nodes {ai.nodes:8} time {elapsed:7.3f}s depth {ai.stats['depth']}")
+
+    hit_rate = 100 * eval_hits / eval_probes if eval_probes else 0
+    print(f"Total: nodes {total_nodes} time {total_time:.3f}s nps {total_nodes / total_time:.0f} eval cache hits {hit_rate:.1f}%")
+
+if __name__ == '__main__':
+    main()
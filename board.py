@@ -15,6 +15,22 @@ class Board:
     def get_piece_by_index(self, index):
         return self.pieces[index]
 
+    def get_masks(self):
+        # Returns (occupied, white, kings) as 32 bit integers, where bit n stands for position n.
+        occupied = 0
+        white = 0
+        kings = 0
+
+        for piece in self.pieces:
+            bit = 1 << int(piece.get_position())
+            occupied |= bit
+            if piece.get_color() == "W":
+                white |= bit
+            if piece.is_king():
+                kings |= bit
+
+        return occupied, white, kings
+
     def has_piece(self, position):
         # Receives position (e.g.: 28), returns True if there's a piece in that position
         string_pos = str(position)
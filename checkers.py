@@ -3,6 +3,15 @@ from sys import exit
 from pygame.locals import *
 from board_gui import BoardGUI
 from game_control import GameControl
+from telemetry import Telemetry
+from contextlib import nullcontext
+import argparse
+import cProfile
+import time
+
+AI_MOVE_DONE = USEREVENT + 1 # Posted by the AI's background search when its move is ready
+IDLE_TIMEOUT = 1000 # Max milliseconds to block waiting for events when nothing is animating
+GAME_RECORD_FILE = "games.pdn" # Finished and abandoned games are appended here
 
 def setup_game():
     print("Welcome to Checkers!")
@@ -31,7 +40,14 @@ def setup_game():
         print("Invalid choice. Defaulting to PvP.")
         return "pvp", "W", None
 
-def main(gamemode, player_color, difficulty):
+def parse_args():
+    parser = argparse.ArgumentParser(description="Checkers in Python")
+    parser.add_argument("--profile", action="store_true", help="time frames, input handling and AI moves and show them in the side panel")
+    parser.add_argument("--profile-dump", metavar="PATH", help="write the timing histograms to a JSON file on exit (implies --profile)")
+    parser.add_argument("--cprofile", metavar="PATH", help="write a cProfile capture of the AI's moves on exit (implies --profile)")
+    return parser.parse_args()
+
+def main(gamemode, player_color, difficulty, args=None):
     import pygame as pg
 
     # --- Main setup ---
@@ -42,50 +58,111 @@ def main(gamemode, player_color, difficulty):
     fps_clock = pg.time.Clock()
     game_control = GameControl(player_color, gamemode == "pvai", difficulty)
 
+    # Players recorded in the saved game
+    ai_player = f"AI ({difficulty})"
+    white_player = ai_player if gamemode == "pvai" and player_color != "W" else "Human"
+    black_player = ai_player if gamemode == "pvai" and player_color != "B" else "Human"
+
     # Font setup
     main_font = pg.font.SysFont("Arial", 25)
     turn_rect = (509, 26)
     winner_rect = (509, 152)
 
+    # --- Optional profiling ---
+    profiling = args is not None and (args.profile or args.profile_dump or args.cprofile)
+    telemetry = Telemetry() if profiling else None
+    ai_profiler = cProfile.Profile() if profiling and args.cprofile else None
+    overlay_font = pg.font.SysFont("monospace", 12) if profiling else None
+    overlay_rect = (509, 300)
+
+    def measure(name):
+        return telemetry.measure(name) if telemetry is not None else nullcontext()
+
     # --- Handle AI first move immediately if AI goes first ---
     if gamemode == "pvai" and game_control.turn != player_color:
         # If AI is white and first move
         game_control.move_ai_first_random()
 
+    def post_ai_move_done():
+        pg.event.post(pg.event.Event(AI_MOVE_DONE))
+
+    # Mouse motion only matters while a piece is held, and then the held piece polls the mouse itself.
+    pg.event.set_blocked(pg.MOUSEMOTION)
+
+    # CPU time spent while idling (waiting on the human), reported on exit.
+    # An idle frame is timed as a whole, from the start of its draw until the wait for events returns.
+    idle_wall_time = 0
+    idle_cpu_time = 0
+
     # --- Main loop ---
     while True:
+        frame_wall_start = time.perf_counter()
+        frame_cpu_start = time.process_time()
+
         # GUI
-        DISPLAYSURF.fill((0, 0, 0))
-        game_control.draw_screen(DISPLAYSURF)
+        with measure("draw"):
+            DISPLAYSURF.fill((0, 0, 0))
+            game_control.draw_screen(DISPLAYSURF)
 
-        # Display turn
-        turn_display_text = "White's turn" if game_control.get_turn() == "W" else "Black's turn"
-        DISPLAYSURF.blit(main_font.render(turn_display_text, True, (255, 255, 255)), turn_rect)
+            # Display turn
+            turn_display_text = "White's turn" if game_control.get_turn() == "W" else "Black's turn"
+            DISPLAYSURF.blit(main_font.render(turn_display_text, True, (255, 255, 255)), turn_rect)
 
-        # Display winner if exists
-        if game_control.get_winner() is not None:
-            winner_text = f"{'White' if game_control.get_winner() == 'W' else 'Black'} wins!"
-            DISPLAYSURF.blit(main_font.render(winner_text, True, (255, 255, 255)), winner_rect)
+            # Display winner if exists
+            if game_control.get_winner() is not None:
+                winner_text = f"{'White' if game_control.get_winner() == 'W' else 'Black'} wins!"
+                DISPLAYSURF.blit(main_font.render(winner_text, True, (255, 255, 255)), winner_rect)
 
-        pg.display.update()
-        fps_clock.tick(FPS)
+            if telemetry is not None:
+                telemetry.draw_overlay(DISPLAYSURF, overlay_font, overlay_rect)
+
+            pg.display.update()
 
         # --- Handle AI moves ---
+        # The search runs in the background and posts AI_MOVE_DONE when finished.
         if gamemode == "pvai" and game_control.get_turn() != player_color and game_control.get_winner() is None:
-            pg.time.delay(50)  # allow GUI update before heavy AI
-            game_control.move_ai()
+            game_control.start_ai_move(post_ai_move_done, ai_profiler)
+
+        # --- Wait for the next frame ---
+        # Run at a fixed frame rate only while something is animating, otherwise sleep until an event arrives.
+        if game_control.held_piece is not None or game_control.is_ai_pending():
+            fps_clock.tick(FPS)
+            events = pg.event.get()
+        else:
+            events = [pg.event.wait(IDLE_TIMEOUT)] + pg.event.get()
+            idle_wall_time += time.perf_counter() - frame_wall_start
+            idle_cpu_time += time.process_time() - frame_cpu_start
+            fps_clock.tick()
 
         # --- Handle user input ---
-        for event in pg.event.get():
-            if event.type == pg.QUIT:
-                pg.quit()
-                return
-            if event.type == pg.MOUSEBUTTONDOWN:
-                game_control.hold_piece(event.pos)
-            if event.type == pg.MOUSEBUTTONUP:
-                game_control.release_piece()
+        with measure("events"):
+            for event in events:
+                if event.type == pg.QUIT:
+                    pg.quit()
+                    if game_control.get_move_history():
+                        with open(GAME_RECORD_FILE, "a") as record_file:
+                            # PDN colors are the Board's swapped (see pdn.py).
+                            game_control.save_game(record_file, {"White": black_player, "Black": white_player})
+                    if idle_wall_time > 0:
+                        print(f"Idle CPU usage: {100 * idle_cpu_time / idle_wall_time:.1f}% over {idle_wall_time:.1f}s")
+                    if args is not None and args.profile_dump:
+                        telemetry.dump(args.profile_dump)
+                    if ai_profiler is not None:
+                        ai_profiler.dump_stats(args.cprofile)
+                    return
+                if event.type == AI_MOVE_DONE:
+                    search_time = game_control.finish_ai_move()
+                    if telemetry is not None and search_time is not None:
+                        telemetry.record("ai_move", search_time)
+                if event.type == pg.MOUSEBUTTONDOWN:
+                    with measure("hold_piece"):
+                        game_control.hold_piece(event.pos)
+                if event.type == pg.MOUSEBUTTONUP:
+                    with measure("release_piece"):
+                        game_control.release_piece()
 
 if __name__ == '__main__':
+    args = parse_args()
     gamemode, player_color, difficulty = setup_game()
-    main(gamemode, player_color, difficulty)
+    main(gamemode, player_color, difficulty, args)
     exit()
\ No newline at end of file
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import time
+
+# Load test client for engine_server.py. Each client plays a game against itself through the server,
+# sending "position startpos moves ..." and "go" for every move, and the request latencies are summarised at the end.
+# Usage: python engine_server.py --tcp 127.0.0.1:7700 &  python engine_client.py --tcp 127.0.0.1:7700 --clients 8
+
+MAX_GAME_MOVES = 100 # Start a new game after this many moves
+
+async def run_client(args, latencies):
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        host, port = args.tcp.rsplit(":", 1)
+        reader, writer = await asyncio.open_connection(host, int(port))
+
+    async def request(line, reply_prefix):
+        writer.write((line + "\n").encode())
+        await writer.drain()
+        while True:
+            reply = (await reader.readline()).decode().strip()
+            if reply.startswith(reply_prefix) or reply.startswith("error"):
+                return reply
+
+    moves = []
+
+    for _ in range(args.requests):
+        if len(moves) >= MAX_GAME_MOVES:
+            moves = []
+
+        position = "position startpos" + (" moves " + " ".join(moves) if moves else "")
+        start_time = time.perf_counter()
+        await request(position, "ok")
+        reply = await request(f"go {args.limit} {args.value}", "bestmove")
+        latencies.append(time.perf_counter() - start_time)
+
+        best_move = reply.split()[1] if reply.startswith("bestmove") else "none"
+        if best_move == "none":
+            moves = []
+        else:
+            moves.append(best_move)
+
+    writer.write(b"quit\n")
+    await writer.drain()
+    writer.close()
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+async def run(args):
+    latencies = []
+    start_time = time.perf_counter()
+    await asyncio.gather(*(run_client(args, latencies) for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start_time
+
+    latencies.sort()
+    print(f"{len(latencies)} requests from {args.clients} clients in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} req/s)")
+    print("latency ms: " + " ".join(f"p{int(fraction * 100)} {percentile(latencies, fraction) * 1000:.1f}" for fraction in (0.5, 0.95, 0.99)) + f" max {latencies[-1] * 1000:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure engine server throughput and latency under concurrent load.")
+    parser.add_argument("--tcp", metavar="HOST:PORT", default="127.0.0.1:7700")
+    parser.add_argument("--unix", metavar="PATH")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=50, help="searches per client")
+    parser.add_argument("--limit", choices=["depth", "nodes", "movetime"], default="depth")
+    parser.add_argument("--value", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+from ai import make_ai_players
+from pdn import START_FEN, PDN_COLORS, fen_to_board, board_to_fen, parse_move, format_move, apply_move, ai_move_to_hop
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Array
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import time
+
+# Long-lived engine process speaking a line-based text protocol over stdin/stdout, TCP or a Unix socket.
+# Searches run on a small pool of worker processes that keep their AI instances (and transposition tables) warm.
+#
+# Commands, one per line:
+#   newgame                                   reset the session to the starting position
+#   position startpos [moves 11-15 23-19 ...]  set the position from the start, optionally playing moves
+#   position fen <FEN> [up B|W] [moves ...]   set the position from a FEN string (see pdn.py); up names the color
+#                                             whose men move towards square 32, Black by default
+#   go [depth N] [nodes N] [movetime MS]      search the position; replies "bestmove <move> ..." when done
+#                                             (without limits, searches for DEFAULT_MOVETIME milliseconds)
+#   ponder                                    search without limits until "stop"
+#   stop                                      end the current search early; it still replies with its bestmove
+#   stats                                     session and server statistics
+#   quit                                      close the session
+# Replies are "ok", "bestmove ...", "stats ..." or "error <reason>".
+
+DEFAULT_MOVETIME = 2000 # Same time limit as the medium difficulty
+MAX_SESSIONS = 1024 # Size of the shared stop flag array, one slot per connected session
+TRANSPOSITION_TABLE_LIMIT = 2000000 # Worker tables are cleared when they grow past this many entries
+
+# --- Worker process side ---
+
+_stop_flags = None
+_ai_players = {}
+
+def _init_worker(stop_flags):
+    global _stop_flags
+    _stop_flags = stop_flags
+
+def _get_worker_ai(color):
+    # AI instances live as long as the worker, so their transposition tables stay warm between requests.
+    if not _ai_players:
+        _ai_players.update(make_ai_players())
+
+    ai = _ai_players[color]
+    if len(ai.transposition_table) > TRANSPOSITION_TABLE_LIMIT:
+        ai.transposition_table.clear()
+    return ai
+
+def _search(slot, fen, color_up, depth, nodes, movetime):
+    # Runs in a worker process. Returns a dictionary with the best (complete, possibly multi-jump) move and search statistics.
+    board, turn = fen_to_board(fen, color_up)
+    ai = _get_worker_ai(turn)
+    ai.max_depth = depth if depth is not None else 64
+    ai.time_limit = movetime / 1000 if movetime is not None else float("inf")
+    ai.node_limit = nodes
+    eval_probes = ai.stats["eval_probes"]
+    eval_hits = ai.stats["eval_hits"]
+    start_time = time.time()
+    deadline = start_time + ai.time_limit
+    # The AI only checks its time limit between depths, the deadline here also interrupts the current depth.
+    ai.should_stop = lambda: _stop_flags[slot] == 1 or time.time() > deadline
+
+    optimal_move = ai.get_move(board)
+    result = {"move": None, "score": None, "depth": 0, "nodes": ai.nodes}
+    # Depth 1 always completes, so the limits can be exceeded by at most one depth 1 search per jump.
+
+    if optimal_move is not None:
+        result["score"] = ai.stats["score"]
+        result["depth"] = ai.stats["depth"]
+        # The AI moves one jump at a time, so keep asking while the moved piece can continue capturing.
+        move = {"path": [int(optimal_move["position_from"])], "captures": False}
+
+        while optimal_move is not None:
+            hop = ai_move_to_hop(board, optimal_move)
+            piece_moved = apply_move(board, hop)
+            move["path"].append(hop["path"][1])
+            move["captures"] = piece_moved.get_has_eaten()
+
+            jump_moves = [jump for jump in piece_moved.get_moves(board) if jump["eats_piece"]]
+            if not (piece_moved.get_has_eaten() and jump_moves):
+                break
+
+            # The rules require the same piece to keep jumping. The continuation shares the node budget and deadline,
+            # and the reported depth is the shallowest depth any searched jump was chosen at.
+            if nodes is not None:
+                ai.node_limit = max(0, nodes - result["nodes"])
+            ai.time_limit = max(0, deadline - time.time())
+            optimal_move = ai.get_move(board, piece_moved.get_position())
+            result["nodes"] += ai.nodes
+            if ai.stats["depth"]:
+                result["depth"] = min(result["depth"], ai.stats["depth"]) if result["depth"] else ai.stats["depth"]
+
+        result["move"] = format_move(move)
+
+    result["time"] = time.time() - start_time
+    result["eval_probes"] = ai.stats["eval_probes"] - eval_probes
+    result["eval_hits"] = ai.stats["eval_hits"] - eval_hits
+    result["table_size"] = len(ai.transposition_table)
+    return result
+
+# --- Server side ---
+
+class EngineServer:
+    def __init__(self, workers):
+        self.stop_flags = Array("b", MAX_SESSIONS, lock=False)
+        # One single-process executor per worker, so each session always reaches the same warm caches.
+        self.executors = [ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(self.stop_flags,)) for _ in range(workers)]
+        self.free_slots = list(range(MAX_SESSIONS))
+        self.stats = {"sessions": 0, "searches": 0, "nodes": 0, "search_time": 0.0, "eval_probes": 0, "eval_hits": 0}
+        self.table_sizes = [0] * workers
+
+    def shutdown(self):
+        # Stops searches in progress first, otherwise workers would finish unbounded searches before exiting.
+        for slot in range(MAX_SESSIONS):
+            self.stop_flags[slot] = 1
+        for executor in self.executors:
+            executor.shutdown(cancel_futures=True)
+
+    async def serve(self, reader, write_line):
+        # Handles one session until the client disconnects or sends "quit".
+        if not self.free_slots:
+            write_line("error too many sessions")
+            return
+
+        session = Session(self, self.free_slots.pop())
+        self.stats["sessions"] += 1
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode().strip()
+                if line == "quit":
+                    break
+                if line:
+                    session.handle(line, write_line)
+        finally:
+            self.stop_flags[session.slot] = 1
+            if session.search is not None:
+                await asyncio.wait([session.search])
+            self.stop_flags[session.slot] = 0
+            self.free_slots.append(session.slot)
+            self.stats["sessions"] -= 1
+
+class Session:
+    def __init__(self, server, slot):
+        self.server = server
+        self.slot = slot
+        self.worker = slot % len(server.executors)
+        self.search = None # asyncio task of the search in progress
+        self.stats = {"searches": 0, "nodes": 0}
+        self.set_position(START_FEN, "W", [])
+
+    def set_position(self, fen, color_up, moves):
+        board, turn = fen_to_board(fen, color_up)
+
+        for move in moves:
+            piece_moved = apply_move(board, move, turn)
+            if move["captures"] and any(jump["eats_piece"] for jump in piece_moved.get_moves(board)):
+                raise ValueError(f"{format_move(move)} is incomplete, the piece can keep capturing")
+            turn = "B" if turn == "W" else "W"
+
+        self.board = board
+        self.turn = turn
+
+    def handle(self, line, write_line):
+        tokens = line.split()
+        command = tokens[0]
+
+        try:
+            if command == "newgame":
+                self.require_idle()
+                self.set_position(START_FEN, "W", [])
+                write_line("ok")
+            elif command == "position":
+                self.require_idle()
+                self.handle_position(tokens[1:])
+                write_line("ok")
+            elif command == "go":
+                self.require_idle()
+                limits = {"depth": None, "nodes": None, "movetime": None}
+                if len(tokens) % 2 == 0:
+                    raise ValueError(f"missing value for {tokens[-1]}")
+                for name, value in zip(tokens[1::2], tokens[2::2]):
+                    if name not in limits:
+                        raise ValueError(f"unknown limit {name}")
+                    if not value.isdigit() or int(value) <= 0:
+                        raise ValueError(f"{name} must be a positive integer")
+                    limits[name] = int(value)
+                if all(limit is None for limit in limits.values()):
+                    limits["movetime"] = DEFAULT_MOVETIME
+                self.start_search(limits, write_line)
+            elif command == "ponder":
+                self.require_idle()
+                self.start_search({"depth": None, "nodes": None, "movetime": None}, write_line)
+            elif command == "stop":
+                if self.search is not None:
+                    self.server.stop_flags[self.slot] = 1
+            elif command == "stats":
+                write_line(self.format_stats())
+            else:
+                raise ValueError(f"unknown command {command}")
+        except Exception as error:
+            # Any malformed or illegal command is reported to the client, it must never end the server.
+            write_line(f"error {str(error) or type(error).__name__}")
+
+    def require_idle(self):
+        if self.search is not None:
+            raise ValueError("search in progress")
+
+    def handle_position(self, arguments):
+        if arguments[:1] == ["startpos"]:
+            fen, rest = START_FEN, arguments[1:]
+        elif arguments[:1] == ["fen"]:
+            if len(arguments) < 2:
+                raise ValueError("missing FEN")
+            fen, rest = arguments[1], arguments[2:]
+        else:
+            raise ValueError("expected startpos or fen")
+
+        color_up = "W"
+        if rest[:1] == ["up"]:
+            if len(rest) < 2:
+                raise ValueError("missing color after up")
+            if rest[1].upper() not in PDN_COLORS:
+                raise ValueError(f"unknown color {rest[1]}")
+            color_up, rest = PDN_COLORS[rest[1].upper()], rest[2:]
+
+        moves = []
+        if rest[:1] == ["moves"]:
+            moves = [parse_move(text) for text in rest[1:]]
+        elif rest:
+            raise ValueError(f"unexpected {rest[0]}")
+
+        self.set_position(fen, color_up, moves)
+
+    def start_search(self, limits, write_line):
+        loop = asyncio.get_running_loop()
+        fen = board_to_fen(self.board, self.turn)
+        self.server.stop_flags[self.slot] = 0
+        future = loop.run_in_executor(self.server.executors[self.worker], _search, self.slot, fen, self.board.get_color_up(), limits["depth"], limits["nodes"], limits["movetime"])
+        self.search = asyncio.ensure_future(self.finish_search(future, write_line))
+
+    async def finish_search(self, future, write_line):
+        try:
+            result = await future
+        except Exception as error:
+            write_line(f"error search failed: {str(error) or type(error).__name__}")
+            return
+        finally:
+            self.search = None
+            self.server.stop_flags[self.slot] = 0
+
+        self.stats["searches"] += 1
+        self.stats["nodes"] += result["nodes"]
+        self.server.stats["searches"] += 1
+        self.server.stats["nodes"] += result["nodes"]
+        self.server.stats["search_time"] += result["time"]
+        self.server.stats["eval_probes"] += result["eval_probes"]
+        self.server.stats["eval_hits"] += result["eval_hits"]
+        self.server.table_sizes[self.worker] = result["table_size"]
+
+        score = "none" if result["score"] is None else f"{result['score']:.2f}"
+        write_line(f"bestmove {result['move'] or 'none'} score {score} depth {result['depth']} nodes {result['nodes']} time {result['time'] * 1000:.0f}")
+
+    def format_stats(self):
+        server_stats = self.server.stats
+        nps = server_stats["nodes"] / server_stats["search_time"] if server_stats["search_time"] else 0
+        eval_hit_rate = 100 * server_stats["eval_hits"] / server_stats["eval_probes"] if server_stats["eval_probes"] else 0
+        return (f"stats session_searches {self.stats['searches']} session_nodes {self.stats['nodes']} "
+                f"sessions {server_stats['sessions']} searches {server_stats['searches']} nodes {server_stats['nodes']} "
+                f"nps {nps:.0f} eval_cache_hits {eval_hit_rate:.1f}% workers {len(self.server.executors)} table_entries {sum(self.server.table_sizes)}")
+
+def make_stream_writer(writer):
+    def write_line(line):
+        if not writer.is_closing():
+            writer.write((line + "\n").encode())
+    return write_line
+
+async def serve_stdio(server):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    def write_line(line):
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+    await server.serve(reader, write_line)
+
+async def run(args):
+    server = EngineServer(args.workers)
+
+    async def handle_connection(reader, writer):
+        try:
+            await server.serve(reader, make_stream_writer(writer))
+        finally:
+            writer.close()
+
+    listeners = []
+    if args.tcp:
+        host, port = args.tcp.rsplit(":", 1)
+        listeners.append(await asyncio.start_server(handle_connection, host, int(port)))
+    if args.unix:
+        listeners.append(await asyncio.start_unix_server(handle_connection, args.unix))
+
+    try:
+        if listeners:
+            await asyncio.gather(*(listener.serve_forever() for listener in listeners))
+        else:
+            await serve_stdio(server)
+    finally:
+        server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the checkers AI as a long-lived engine server.")
+    parser.add_argument("--tcp", metavar="HOST:PORT", help="listen on a TCP socket instead of stdin/stdout")
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of stdin/stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    # Exit through the normal shutdown path on SIGTERM so the worker processes are stopped too.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
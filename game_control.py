@@ -3,8 +3,12 @@ from board import Board
 from board_gui import BoardGUI
 from held_piece import HeldPiece
 from ai import AI
+from pdn import write_game, record_hop, get_result
 from utils import get_surface_mouse_offset, get_piece_position
+from copy import deepcopy
+from threading import Thread
 import random
+import time
 
 class GameControl:
     def __init__(self, player_color, is_computer_opponent, difficulty=None):
@@ -19,12 +23,18 @@ class GameControl:
         self.board_draw = None
         self.held_piece = None
         self.ai_control = None
+        self.ai_thread = None # Background search started by start_ai_move()
+        self.ai_result = None
+        self.jumping_piece = None # Position of the piece that must continue a multi-jump, if any
+        self.move_history = [] # Moves played so far, as {"path": [positions], "captures": bool} dictionaries
 
         if is_computer_opponent:
             ai_color = "B" if player_color == "W" else "W"
             starting_turn = "W"  # White always starts in Checkers
             self.turn = starting_turn
             self.ai_control = AI(ai_color, difficulty)  # Pass difficulty to AI
+            # Forced moves are played at once, the AI uses the time to search the position they lead to.
+            self.ai_control.ponder_forced_moves = True
 
         self.setup()
 
@@ -34,6 +44,16 @@ class GameControl:
     def get_winner(self):
         return self.winner
 
+    def get_move_history(self):
+        return self.move_history
+
+    def record_move(self, position_from, position_to, captures):
+        record_hop(self.move_history, position_from, position_to, captures)
+
+    def save_game(self, file, tags=None):
+        # Writes the game played so far to an open text file in PDN.
+        write_game(file, self.move_history, get_result(self.winner), tags)
+
     def setup(self):
         # Initial setup
         pieces = []
@@ -65,6 +85,10 @@ class GameControl:
         
         if piece_clicked["piece"]["color"] != self.turn:
             return
+
+        # In the middle of a multi-jump only the jumping piece can move.
+        if self.jumping_piece is not None and board_pieces[piece_clicked["index"]].get_position() != self.jumping_piece:
+            return
         
         # Determines if player has a jump restraint
         for piece in board_pieces:
@@ -122,7 +146,10 @@ class GameControl:
         # Only moves the piece if dropped in a proper move mark
         if position_released is not None:
             # perform the move
-            self.board.move_piece(moved_index, self.board_draw.get_position_by_rect(position_released))
+            position_from = int(piece_moved.get_position())
+            position_to = self.board_draw.get_position_by_rect(position_released)
+            self.board.move_piece(moved_index, position_to)
+            self.record_move(position_from, position_to, piece_moved.get_has_eaten())
             self.board_draw.set_pieces(self.board_draw.get_piece_properties(self.board))
             self.winner = self.board.get_winner()
 
@@ -141,9 +168,12 @@ class GameControl:
                     move_marks.append((row, col))
 
                 self.held_piece = None
+                self.jumping_piece = piece_moved.get_position()
                 self.board_draw.set_move_marks(move_marks)
                 return  # keep the same turn, don't switch yet
 
+            self.jumping_piece = None
+
             # --- Otherwise, determine next turn ---
             next_turn = "B" if self.turn == "W" else "W"
 
@@ -171,8 +201,49 @@ class GameControl:
         if self.turn != self.ai_control.color:
             return
 
-        optimal_move = self.ai_control.get_move(self.board)
+        self.apply_ai_move(self.ai_control.get_move(self.board, self.jumping_piece))
 
+    def start_ai_move(self, on_done=None, profiler=None):
+        # Starts searching the AI's move on a background thread so the GUI stays responsive.
+        # The search works on a copy of the board; on_done is called from that thread once the result is ready.
+        # An optional cProfile.Profile collects the search's profile.
+        if self.turn != self.ai_control.color or self.is_ai_pending():
+            return
+
+        board_copy = Board(deepcopy(self.board.get_pieces()), self.board.get_color_up())
+        jumping_piece = self.jumping_piece
+
+        def search():
+            start_time = time.perf_counter()
+            if profiler is not None:
+                move = profiler.runcall(self.ai_control.get_move, board_copy, jumping_piece)
+            else:
+                move = self.ai_control.get_move(board_copy, jumping_piece)
+            self.ai_result = {"move": move, "time": time.perf_counter() - start_time}
+            if on_done is not None:
+                on_done()
+
+        self.ai_thread = Thread(target=search, daemon=True)
+        self.ai_thread.start()
+
+    def is_ai_pending(self):
+        # True while a background search is running or its result hasn't been applied yet.
+        return self.ai_thread is not None
+
+    def finish_ai_move(self):
+        # Applies the result of a background search started by start_ai_move(), if it has finished.
+        # Returns the time the search took in seconds, or None if there was no result to apply.
+        # The result is stored before on_done runs, while the thread may still be alive, so the result is what's checked.
+        if self.ai_thread is None or self.ai_result is None:
+            return None
+
+        result = self.ai_result
+        self.ai_thread = None
+        self.ai_result = None
+        self.apply_ai_move(result["move"])
+        return result["time"]
+
+    def apply_ai_move(self, optimal_move):
         # If no move possible, AI loses
         if optimal_move is None:
             self.winner = "B" if self.turn == "W" else "W"
@@ -191,6 +262,7 @@ class GameControl:
             raise RuntimeError("AI was supposed to return a move from an existing piece but found none.")
         
         self.board.move_piece(index_moved, int(optimal_move["position_to"]))
+        self.record_move(int(optimal_move["position_from"]), int(optimal_move["position_to"]), piece_moved.get_has_eaten())
         self.board_draw.set_pieces(self.board_draw.get_piece_properties(self.board))
         self.winner = self.board.get_winner()
 
@@ -198,7 +270,10 @@ class GameControl:
         jump_moves = list(filter(lambda move: move["eats_piece"] == True, piece_moved.get_moves(self.board)))
 
         if len(jump_moves) == 0 or piece_moved.get_has_eaten() == False:
+            self.jumping_piece = None
             self.turn = "B" if self.turn == "W" else "W"
+        else:
+            self.jumping_piece = piece_moved.get_position()
 
     def move_ai_first_random(self):
         """Make a random move for AI (used for first move)"""
@@ -221,7 +296,9 @@ class GameControl:
             return
 
         move = random.choice(possible_moves)
+        position_from = int(self.board.get_piece_by_index(move["piece"]).get_position())
         self.board.move_piece(move["piece"], int(move["move"]["position"]))
+        self.record_move(position_from, int(move["move"]["position"]), move["move"]["eats_piece"])
         self.board_draw.set_pieces(self.board_draw.get_piece_properties(self.board))
         self.winner = self.board.get_winner()
         self.turn = "B" if ai_color == "W" else "W"
\ No newline at end of file
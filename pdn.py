@@ -0,0 +1,243 @@
+from piece import Piece
+from board import Board
+import re
+
+# PDN (Portable Draughts Notation) game records, in the standard English draughts (GameType 21) numbering and colors.
+# The Board is the standard board upside down: its White moves first from rows 5-7 towards row 0, which is the
+# standard Black moving from squares 1-12 towards 32. So Board colors are swapped in PDN (a game the Board's White
+# wins is "0-1") and the Board position r * 4 + i (row r) is square (7 - r) * 4 + i + 1, e.g. the opening move from
+# position 21 to 17 is written 10-14.
+# FEN strings and the turn they return use Board colors in code and PDN colors in text.
+
+START_FEN = "B:W21,22,23,24,25,26,27,28,29,30,31,32:B1,2,3,4,5,6,7,8,9,10,11,12"
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+TAG_PATTERN = re.compile(r'^\[(\w+)\s+"(.*)"\]$')
+MOVE_PATTERN = re.compile(r'^\d+([-x]\d+)+$')
+MOVE_NUMBER_PATTERN = re.compile(r'^\d+\.+') # Also strips numbers written against the move, as in "1.11-15"
+ANNOTATION_PATTERN = re.compile(r'[!?]+$')
+
+PDN_COLORS = {"W": "B", "B": "W"} # Board color to PDN color, and back
+
+def position_to_square(position):
+    # Receives a Board position (0-31), returns its PDN square number (1-32).
+    return (7 - position // 4) * 4 + position % 4 + 1
+
+def square_to_position(square):
+    # Inverse of position_to_square().
+    return (7 - (square - 1) // 4) * 4 + (square - 1) % 4
+
+def get_result(winner):
+    # Receives the winning Board color (or None), returns the PDN result.
+    return {"W": "0-1", "B": "1-0"}.get(winner, "*")
+
+def board_to_fen(board, turn):
+    # Receives a board and the color to move, returns a FEN string such as "B:W21,K22:B1,2".
+    squares = {"W": [], "B": []}
+
+    for square, piece in sorted((position_to_square(int(piece.get_position())), piece) for piece in board.get_pieces()):
+        squares[PDN_COLORS[piece.get_color()]].append(f"K{square}" if piece.is_king() else str(square))
+
+    return f"{PDN_COLORS[turn]}:W{','.join(squares['W'])}:B{','.join(squares['B'])}"
+
+def fen_to_board(fen, color_up="W"):
+    # Receives a FEN string, returns a (Board, turn) tuple. Raises ValueError if the string isn't a valid position.
+    fields = fen.strip().split(":")
+    if fields[0].upper() not in PDN_COLORS:
+        raise ValueError(f"Invalid color to move in FEN: {fields[0]!r}")
+    turn = PDN_COLORS[fields[0].upper()]
+    pieces = []
+    squares_used = set()
+
+    for field in fields[1:]:
+        if field[:1].upper() not in PDN_COLORS:
+            raise ValueError(f"Invalid color in FEN: {field!r}")
+        color = PDN_COLORS[field[0].upper()]
+        for square in field[1:].split(","):
+            if square == "":
+                continue
+            is_king = square[0].upper() == "K"
+            number = square[1:] if is_king else square
+            if not number.isdigit() or not 1 <= int(number) <= 32:
+                raise ValueError(f"Invalid square in FEN: {square!r}")
+            if int(number) in squares_used:
+                raise ValueError(f"Square {number} appears twice in FEN")
+            squares_used.add(int(number))
+            position = square_to_position(int(number))
+            pieces.append(Piece(str(position) + color + ("Y" if is_king else "N")))
+
+    return Board(pieces, color_up), turn
+
+def format_move(move):
+    # Receives a move dictionary ({"path": [positions], "captures": bool}), returns its PDN text, e.g. "22-18" or "23x14x5".
+    separator = "x" if move["captures"] else "-"
+    return separator.join(str(position_to_square(position)) for position in move["path"])
+
+def parse_move(text):
+    # Inverse of format_move().
+    captures = "x" in text
+    path = [square_to_position(int(square)) for square in re.split(r"[-x]", text)]
+    return {"path": path, "captures": captures}
+
+def ai_move_to_hop(board, optimal_move):
+    # Receives a move returned by AI.get_move ({"position_from", "position_to"}), returns it as a single-jump move dictionary.
+    path = [int(optimal_move["position_from"]), int(optimal_move["position_to"])]
+    return {"path": path, "captures": abs(board.get_row_number(path[0]) - board.get_row_number(path[1])) == 2}
+
+def record_hop(moves, position_from, position_to, captures):
+    # Appends a single piece movement to a list of moves. Jumps that continue the previous capture are part of the same move.
+    if captures and moves:
+        last_move = moves[-1]
+        if last_move["captures"] and last_move["path"][-1] == position_from:
+            last_move["path"].append(position_to)
+            return
+
+    moves.append({"path": [position_from, position_to], "captures": captures})
+
+def write_game(file, moves, result="*", tags=None):
+    # Writes a single game to an open text file.
+    # moves is a list of move dictionaries in the order they were played, tags an optional dictionary of extra PDN tags.
+    all_tags = {"Event": "Checkers in Python", "GameType": "21"}
+    all_tags.update(tags or {})
+    all_tags["Result"] = result
+
+    for key, value in all_tags.items():
+        file.write(f'[{key} "{value}"]\n')
+    file.write("\n")
+
+    turn = fen_to_board(all_tags.get("FEN", START_FEN))[1]
+    move_number = 1
+    line = ""
+    tokens = []
+
+    for index, move in enumerate(moves):
+        # Move numbers count the first mover's moves, which is the Board's White.
+        if turn == "W":
+            tokens.append(f"{move_number}.")
+        elif index == 0:
+            tokens.append(f"{move_number}...")
+        tokens.append(format_move(move))
+        if turn == "B":
+            move_number += 1
+        turn = "B" if turn == "W" else "W"
+
+    tokens.append(result)
+
+    # Keeps lines at a readable width, as PDN files are usually wrapped at 80 columns.
+    for token in tokens:
+        if line and len(line) + len(token) + 1 > 79:
+            file.write(line + "\n")
+            line = ""
+        line = f"{line} {token}" if line else token
+
+    file.write(line + "\n\n")
+
+def read_games(file):
+    # Generator that parses games from an open text file one at a time, so files of any size use constant memory.
+    # Yields dictionaries with the keys "tags", "moves" and "result". Comments ({...}), variations ((...)), move
+    # numbers, annotations (!, ?) and NAGs ($1) are skipped. A game with movetext that can't be read gets an "error"
+    # key instead of stopping the whole file; replay_game() raises ValueError for it.
+    game = None
+    in_comment = False
+    variation_depth = 0
+
+    def new_game():
+        return {"tags": {}, "moves": [], "result": "*"}
+
+    for line in file:
+        line = line.strip()
+
+        if not in_comment and variation_depth == 0:
+            tag = TAG_PATTERN.match(line)
+            if tag is not None:
+                # A tag after movetext means the previous game ended without a result token.
+                if game is not None and (game["moves"] or "error" in game):
+                    yield game
+                    game = None
+                if game is None:
+                    game = new_game()
+                game["tags"][tag.group(1)] = tag.group(2)
+                continue
+
+        # Comments and variations can span several lines, and variations can be nested.
+        movetext = []
+        for character in line:
+            if in_comment:
+                in_comment = character != "}"
+            elif character == "{":
+                in_comment = True
+            elif character == "(":
+                variation_depth += 1
+            elif character == ")" and variation_depth > 0:
+                variation_depth -= 1
+            elif variation_depth == 0:
+                movetext.append(character)
+
+        for token in "".join(movetext).split():
+            if game is None:
+                game = new_game()
+
+            if token in RESULTS:
+                game["result"] = token
+                yield game
+                game = None
+                continue
+
+            token = ANNOTATION_PATTERN.sub("", MOVE_NUMBER_PATTERN.sub("", token))
+            if token == "" or token.startswith("$") or "error" in game:
+                continue
+            if MOVE_PATTERN.match(token):
+                game["moves"].append(parse_move(token))
+            else:
+                game["error"] = f"Unexpected token in PDN movetext: {token!r}"
+
+    if game is not None and (game["moves"] or game["tags"] or "error" in game):
+        yield game
+
+def get_start_board(game):
+    # Returns the (Board, turn) a game record starts from.
+    return fen_to_board(game["tags"].get("FEN", START_FEN))
+
+def apply_move(board, move, turn=None):
+    # Plays a whole (possibly multi-jump) move on the board through Board.move_piece. Returns the piece moved.
+    # Raises ValueError if the move is illegal. If turn is given, the piece moved must be of that color.
+    # A capture may stop before the last jump, as the AI and the engine play multi-jumps one jump at a time.
+    for index, piece in enumerate(board.get_pieces()):
+        if int(piece.get_position()) == move["path"][0]:
+            piece_index = index
+            break
+    else:
+        raise ValueError(f"No piece on square {position_to_square(move['path'][0])} to play {format_move(move)}")
+
+    piece_moved = board.get_piece_by_index(piece_index)
+    if turn is not None and piece_moved.get_color() != turn:
+        raise ValueError(f"{format_move(move)} moves a piece of the wrong color, {PDN_COLORS[turn]} is to move")
+    if len(move["path"]) < 2 or (not move["captures"] and len(move["path"]) > 2):
+        raise ValueError(f"{format_move(move)} is not a valid move")
+    if not move["captures"]:
+        # Captures are compulsory.
+        for piece in board.get_pieces():
+            if piece.get_color() == piece_moved.get_color() and any(jump["eats_piece"] for jump in piece.get_moves(board)):
+                raise ValueError(f"{format_move(move)} is illegal, a capture is available")
+
+    for position in move["path"][1:]:
+        if {"position": str(position), "eats_piece": move["captures"]} not in piece_moved.get_moves(board):
+            raise ValueError(f"{format_move(move)} is illegal")
+        board.move_piece(piece_index, position)
+        # Capturing removes a piece from the list, which can shift the moving piece's index.
+        piece_index = board.get_pieces().index(piece_moved)
+
+    return piece_moved
+
+def replay_game(game):
+    # Generator that replays a game record, yielding (board, turn, move) before each move is applied.
+    # The same Board object is updated in place after each yield, so copy it if it needs to be kept.
+    if "error" in game:
+        raise ValueError(game["error"])
+
+    board, turn = get_start_board(game)
+
+    for move in game["moves"]:
+        yield board, turn, move
+        apply_move(board, move, turn)
+        turn = "B" if turn == "W" else "W"
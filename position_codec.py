@@ -0,0 +1,111 @@
+from piece import Piece
+from board import Board
+import numpy as np
+import struct
+
+# Fixed-width binary encoding of positions, used for self-play datasets, books and tuning data.
+# Each position takes 16 bytes: the occupied, white and king masks (bit n is Board position n) as little-endian
+# 32 bit integers, then the color to move and the color moving up (0 for White, 1 for Black) and two padding bytes.
+
+POSITION_SIZE = 16
+POSITION_STRUCT = struct.Struct("<IIIBB2x")
+POSITION_DTYPE = np.dtype([
+    ("occupied", "<u4"),
+    ("white", "<u4"),
+    ("kings", "<u4"),
+    ("turn", "u1"),
+    ("color_up", "u1"),
+    ("padding", "u1", 2),
+])
+
+COLOR_CODES = {"W": 0, "B": 1}
+COLORS = ("W", "B")
+REVERSED_BYTES = np.array([int(f"{byte:08b}"[::-1], 2) for byte in range(256)], dtype=np.uint8)
+
+def encode_position(board, turn):
+    # Receives a board and the color to move, returns its 16 byte encoding.
+    occupied, white, kings = board.get_masks()
+    return POSITION_STRUCT.pack(occupied, white, kings, COLOR_CODES[turn], COLOR_CODES[board.get_color_up()])
+
+def masks_to_board(occupied, white, kings, color_up):
+    # Builds a Board from its masks. Pieces are ordered by position.
+    pieces = []
+
+    for position in range(32):
+        bit = 1 << position
+        if occupied & bit:
+            color = "W" if white & bit else "B"
+            pieces.append(Piece(str(position) + color + ("Y" if kings & bit else "N")))
+
+    return Board(pieces, color_up)
+
+def decode_position(data):
+    # Inverse of encode_position(), returns a (Board, turn) tuple.
+    occupied, white, kings, turn, color_up = POSITION_STRUCT.unpack(data)
+    return masks_to_board(occupied, white, kings, COLORS[color_up]), COLORS[turn]
+
+# --- Bulk functions, working on NumPy arrays of POSITION_DTYPE without a Python object per position ---
+
+def encode_positions(positions):
+    # Receives an iterable of (board, turn) tuples, returns a POSITION_DTYPE array.
+    return np.frombuffer(b"".join(encode_position(board, turn) for board, turn in positions), dtype=POSITION_DTYPE)
+
+def pack_positions(occupied, white, kings, turn, color_up):
+    # Builds a POSITION_DTYPE array from equal-length arrays of masks and color codes.
+    positions = np.zeros(len(occupied), dtype=POSITION_DTYPE)
+    positions["occupied"] = occupied
+    positions["white"] = white
+    positions["kings"] = kings
+    positions["turn"] = turn
+    positions["color_up"] = color_up
+    return positions
+
+def positions_from_buffer(buffer):
+    # Returns a POSITION_DTYPE array viewing a bytes-like object (no copy is made).
+    return np.frombuffer(buffer, dtype=POSITION_DTYPE)
+
+def open_position_file(path, mode="r", count=None):
+    # Memory-maps a file of encoded positions. mode is "r", "r+" or "w+"; count is required when creating a file.
+    return np.memmap(path, dtype=POSITION_DTYPE, mode=mode, shape=count if mode == "w+" else None)
+
+def append_positions(path, positions):
+    # Appends a POSITION_DTYPE array to a position file, creating it if needed.
+    with open(path, "ab") as position_file:
+        position_file.write(np.ascontiguousarray(positions, dtype=POSITION_DTYPE).tobytes())
+
+def unpack_squares(masks):
+    # Receives an array of N masks, returns an (N, 32) boolean array where column n is set if bit n is.
+    mask_bytes = np.ascontiguousarray(masks, dtype="<u4").view(np.uint8).reshape(-1, 4)
+    return np.unpackbits(mask_bytes, axis=1, bitorder="little").astype(bool)
+
+def decode_positions(positions):
+    # Converts a POSITION_DTYPE array back to a list of (Board, turn) tuples, for when Board objects are needed.
+    return [(masks_to_board(int(position["occupied"]), int(position["white"]), int(position["kings"]), COLORS[position["color_up"]]), COLORS[position["turn"]]) for position in positions]
+
+def reverse_masks(masks):
+    # Reverses the bits of an array of 32 bit masks, mapping position n to 31 - n (a 180 degree rotation).
+    mask_bytes = np.ascontiguousarray(masks, dtype="<u4").view(np.uint8).reshape(-1, 4)
+    return np.ascontiguousarray(REVERSED_BYTES[mask_bytes[:, ::-1]]).view("<u4").reshape(-1)
+
+def canonicalize_positions(positions):
+    # Returns (canonical, flipped) for a POSITION_DTYPE array: each position is replaced by its mirror (rotated 180 degrees
+    # with colors and the side to move swapped) when the mirror's masks compare smaller, which is the same choice
+    # AI._hash_board makes. flipped is a boolean array; values stored for flipped positions belong to the other color.
+    mirrored = positions.copy()
+    mirrored["occupied"] = reverse_masks(positions["occupied"])
+    mirrored["white"] = reverse_masks(positions["occupied"] & ~positions["white"])
+    mirrored["kings"] = reverse_masks(positions["kings"])
+    mirrored["turn"] = 1 - positions["turn"]
+
+    def sort_keys(array):
+        high = (array["occupied"].astype(np.uint64) << np.uint64(32)) | array["white"].astype(np.uint64)
+        low = (array["kings"].astype(np.uint64) << np.uint64(1)) | array["turn"].astype(np.uint64)
+        return high, low
+
+    high, low = sort_keys(positions)
+    mirrored_high, mirrored_low = sort_keys(mirrored)
+    flipped = (mirrored_high < high) | ((mirrored_high == high) & (mirrored_low < low))
+
+    canonical = positions.copy()
+    canonical[flipped] = mirrored[flipped]
+    return canonical, flipped
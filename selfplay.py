@@ -0,0 +1,101 @@
+from ai import AI
+from pdn import START_FEN, fen_to_board, record_hop, write_game, get_result
+from multiprocessing import Pool
+import argparse
+import random
+
+# Plays AI vs AI games without the GUI and writes them to a PDN file.
+# Usage: python selfplay.py --games 100 --out selfplay.pdn
+
+MAX_PLIES = 200 # Games longer than this are adjudicated as draws
+
+def get_legal_moves(board, color, piece_position=None):
+    # Returns every move available to a color as {"piece": index, "move": move} dictionaries, enforcing the jump rule.
+    # piece_position restricts the moves to the piece on that position, for continuing a multi-jump.
+    possible_moves = []
+
+    for index, piece in enumerate(board.get_pieces()):
+        if piece.get_color() != color:
+            continue
+        if piece_position is not None and piece.get_position() != piece_position:
+            continue
+        for move in piece.get_moves(board):
+            possible_moves.append({"piece": index, "move": move})
+
+    jump_moves = [move for move in possible_moves if move["move"]["eats_piece"]]
+    return jump_moves if jump_moves else possible_moves
+
+def play_game(difficulty="easy", random_plies=2, seed=None, depth=None):
+    # Plays a single game and returns (moves, result).
+    # The first random_plies plies are random so that games starting from the same position differ.
+    rng = random.Random(seed)
+    board, turn = fen_to_board(START_FEN)
+    ai_players = {"W": AI("W", difficulty), "B": AI("B", difficulty)}
+    moves = []
+    jumping_piece = None # Position of the piece that must continue a multi-jump, if any
+
+    if depth is not None:
+        for ai in ai_players.values():
+            ai.max_depth = depth
+            ai.time_limit = float("inf")
+
+    for ply in range(MAX_PLIES):
+        opponent = "B" if turn == "W" else "W"
+
+        if ply < random_plies:
+            legal_moves = get_legal_moves(board, turn, jumping_piece)
+            if not legal_moves:
+                return moves, get_result(opponent)
+            move = rng.choice(legal_moves)
+            index_moved = move["piece"]
+            position_to = int(move["move"]["position"])
+        else:
+            optimal_move = ai_players[turn].get_move(board, jumping_piece)
+            if optimal_move is None:
+                return moves, get_result(opponent)
+            index_moved = [piece.get_position() for piece in board.get_pieces()].index(optimal_move["position_from"])
+            position_to = int(optimal_move["position_to"])
+
+        piece_moved = board.get_piece_by_index(index_moved)
+        position_from = int(piece_moved.get_position())
+        board.move_piece(index_moved, position_to)
+        record_hop(moves, position_from, position_to, piece_moved.get_has_eaten())
+
+        winner = board.get_winner()
+        if winner is not None:
+            return moves, get_result(winner)
+
+        # Same rule as GameControl: a piece that can keep jumping grants an extra turn.
+        jump_moves = [move for move in piece_moved.get_moves(board) if move["eats_piece"]]
+        if piece_moved.get_has_eaten() and jump_moves:
+            jumping_piece = piece_moved.get_position()
+        else:
+            jumping_piece = None
+            turn = opponent
+
+    return moves, "1/2-1/2"
+
+def play_game_from_args(args):
+    return play_game(*args)
+
+def main():
+    parser = argparse.ArgumentParser(description="Play AI vs AI games and save them as PDN.")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--out", default="selfplay.pdn")
+    parser.add_argument("--difficulty", choices=["easy", "medium", "hard"], default="easy")
+    parser.add_argument("--depth", type=int, default=None, help="fixed search depth instead of the difficulty's time limit")
+    parser.add_argument("--random-plies", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    jobs = [(args.difficulty, args.random_plies, args.seed + game, args.depth) for game in range(args.games)]
+    ai_name = f"AI ({args.difficulty})" if args.depth is None else f"AI (depth {args.depth})"
+
+    with Pool(args.workers) as pool, open(args.out, "a") as out_file:
+        for game_number, (moves, result) in enumerate(pool.imap(play_game_from_args, jobs)):
+            write_game(out_file, moves, result, {"Event": "Self-play", "Round": str(game_number + 1), "White": ai_name, "Black": ai_name})
+            print(f"Game {game_number + 1}/{args.games}: {result} in {len(moves)} moves")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+from contextlib import contextmanager
+import json
+import time
+
+# Opt-in timing of the game loop (python checkers.py --profile), shown in the side panel and optionally dumped on exit.
+
+RING_SIZE = 512 # Recent samples kept per metric for percentiles
+BUCKET_COUNT = 16 # Histogram buckets: under 1 ms, 1-2 ms, 2-4 ms, ... and one for everything above
+OVERLAY_COLOR = (180, 180, 180)
+OVERLAY_LINE_HEIGHT = 18
+
+class RingHistogram:
+    def __init__(self, size=RING_SIZE):
+        self.samples = [0.0] * size # Milliseconds, overwritten oldest first
+        self.index = 0
+        self.count = 0 # Total samples recorded, including the ones already overwritten
+        self.buckets = [0] * BUCKET_COUNT
+        self.maximum = 0.0
+
+    def add(self, milliseconds):
+        self.samples[self.index] = milliseconds
+        self.index = (self.index + 1) % len(self.samples)
+        self.count += 1
+        self.maximum = max(self.maximum, milliseconds)
+        self.buckets[min(BUCKET_COUNT - 1, int(milliseconds).bit_length())] += 1
+
+    def get_percentiles(self, *fractions):
+        # Returns the requested percentiles of the recent samples, in milliseconds.
+        recent = sorted(self.samples[:min(self.count, len(self.samples))])
+        if not recent:
+            return [0.0 for _ in fractions]
+        return [recent[min(len(recent) - 1, int(fraction * len(recent)))] for fraction in fractions]
+
+    def to_dict(self):
+        p50, p95, p99 = self.get_percentiles(0.5, 0.95, 0.99)
+        return {"count": self.count, "p50": p50, "p95": p95, "p99": p99, "max": self.maximum, "buckets_ms": self.buckets}
+
+class Telemetry:
+    # Metrics shown in the overlay, in order, with their labels.
+    METRICS = (("draw", "Draw"), ("events", "Events"), ("hold_piece", "Hold"), ("release_piece", "Release"), ("ai_move", "AI move"))
+
+    def __init__(self):
+        self.histograms = {name: RingHistogram() for name, _ in self.METRICS}
+
+    def record(self, name, seconds):
+        self.histograms[name].add(seconds * 1000)
+
+    @contextmanager
+    def measure(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    def draw_overlay(self, display_surface, font, position):
+        # Draws p50/p95/p99 (ms) of every metric, one line each, starting at position.
+        x, y = position
+        header = f"{'ms':<7}" + "".join(f"{column:>6}" for column in ("p50", "p95", "p99"))
+        display_surface.blit(font.render(header, True, OVERLAY_COLOR), (x, y))
+
+        for name, label in self.METRICS:
+            y += OVERLAY_LINE_HEIGHT
+            percentiles = self.histograms[name].get_percentiles(0.5, 0.95, 0.99)
+            text = f"{label:<7}" + "".join(f"{value:6.1f}" for value in percentiles)
+            display_surface.blit(font.render(text, True, OVERLAY_COLOR), (x, y))
+
+    def dump(self, path):
+        with open(path, "w") as dump_file:
+            json.dump({name: histogram.to_dict() for name, histogram in self.histograms.items()}, dump_file, indent=4)
@@ -0,0 +1,150 @@
+from ai import FEATURES, WEIGHTS_FILE, load_weights, get_features
+from pdn import read_games, replay_game
+from utils import batched
+from multiprocessing import Pool
+import argparse
+import json
+import numpy as np
+import os
+import time
+
+# Texel-style tuning of the evaluation weights used by AI.get_value.
+# 1. python tune.py extract games.pdn features.npz   replays game records into a feature matrix and result vector
+# 2. python tune.py fit features.npz                 fits the weights and writes weights.json, which AI loads at startup
+#
+# The fit minimises the mean squared error between sigmoid(K * evaluation) and the game result (1 White won,
+# 0.5 draw, 0 Black won), with evaluations taken from White's point of view. White is the Board's White, which is
+# Black in PDN (see pdn.py), so a "0-1" result is a White win here.
+
+RESULT_VALUES = {"0-1": 1.0, "1/2-1/2": 0.5, "1-0": 0.0}
+GAMES_PER_TASK = 64 # Games each worker extracts at a time
+SKIP_OPENING_PLIES = 4 # Opening positions say little about the result
+
+def extract_games(games):
+    # Returns the feature rows and results of every quiet position in a list of games, and the number of games skipped
+    # because they couldn't be read or replayed.
+    rows = []
+    results = []
+    skipped = 0
+
+    for game in games:
+        result = RESULT_VALUES.get(game["result"])
+        if result is None:
+            continue
+
+        game_rows = []
+        try:
+            for ply, (board, turn, move) in enumerate(replay_game(game)):
+                # Positions where a capture is played are not quiet, their static evaluation is misleading.
+                if ply < SKIP_OPENING_PLIES or move["captures"]:
+                    continue
+                game_rows.append(get_features(board, "W"))
+        except ValueError:
+            skipped += 1
+            continue
+
+        rows.extend(game_rows)
+        results.extend([result] * len(game_rows))
+
+    return np.array(rows, dtype=np.float64).reshape(-1, len(FEATURES)), np.array(results, dtype=np.float64), skipped
+
+def extract(args):
+    start_time = time.time()
+    feature_chunks = []
+    result_chunks = []
+    skipped = 0
+
+    with Pool(args.workers) as pool, open(args.games) as games_file:
+        tasks = batched(read_games(games_file), GAMES_PER_TASK)
+        for task_batch in batched(tasks, 2 * args.workers):
+            for features, results, games_skipped in pool.imap_unordered(extract_games, task_batch):
+                feature_chunks.append(features)
+                result_chunks.append(results)
+                skipped += games_skipped
+
+    features = np.concatenate(feature_chunks) if feature_chunks else np.zeros((0, len(FEATURES)))
+    results = np.concatenate(result_chunks) if result_chunks else np.zeros(0)
+    np.savez(args.out, features=features, results=results)
+    print(f"Extracted {len(results)} positions in {time.time() - start_time:.1f}s, skipped {skipped} unreadable games")
+
+def sigmoid(values):
+    return 1 / (1 + np.exp(-values))
+
+def get_error(features, results, weights, k):
+    return np.mean((results - sigmoid(k * (features @ weights))) ** 2)
+
+def fit_scale(features, results, weights):
+    # Finds the K that best maps the current evaluation to results, so the tuned weights keep the same scale.
+    candidates = np.linspace(0.05, 3.0, 60)
+    errors = [get_error(features, results, weights, k) for k in candidates]
+    return candidates[int(np.argmin(errors))]
+
+def fit(args):
+    data = np.load(args.features)
+    features = data["features"]
+    results = data["results"]
+    rng = np.random.default_rng(args.seed)
+    start_time = time.time()
+
+    initial = load_weights()
+    weights = np.array([initial[name] for name in FEATURES], dtype=np.float64)
+    k = fit_scale(features, results, weights)
+    print(f"{len(results)} positions, K = {k:.2f}, initial error {get_error(features, results, weights, k):.6f}")
+
+    # Adam on mini-batches. Every step is a couple of matrix-vector products, which NumPy hands to BLAS.
+    first_moment = np.zeros_like(weights)
+    second_moment = np.zeros_like(weights)
+    step = 0
+
+    for epoch in range(1, args.epochs + 1):
+        order = rng.permutation(len(results))
+
+        for batch_start in range(0, len(results), args.batch_size):
+            batch = order[batch_start:batch_start + args.batch_size]
+            batch_features = features[batch]
+            predictions = sigmoid(k * (batch_features @ weights))
+            # Derivative of the squared error through the sigmoid.
+            errors = (predictions - results[batch]) * predictions * (1 - predictions)
+            gradient = (2 * k / len(batch)) * (batch_features.T @ errors)
+
+            step += 1
+            first_moment = 0.9 * first_moment + 0.1 * gradient
+            second_moment = 0.999 * second_moment + 0.001 * gradient ** 2
+            corrected_first = first_moment / (1 - 0.9 ** step)
+            corrected_second = second_moment / (1 - 0.999 ** step)
+            weights -= args.learning_rate * corrected_first / (np.sqrt(corrected_second) + 1e-8)
+
+        if epoch % 10 == 0 or epoch == args.epochs:
+            print(f"Epoch {epoch}: error {get_error(features, results, weights, k):.6f}")
+
+    tuned = {name: round(float(weight), 4) for name, weight in zip(FEATURES, weights)}
+
+    with open(args.out, "w") as weights_file:
+        json.dump(tuned, weights_file, indent=4)
+
+    print(f"Wrote {tuned} to {args.out} in {time.time() - start_time:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the AI's evaluation weights from game records.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    extract_parser = subparsers.add_parser("extract", help="build a feature matrix from a PDN file")
+    extract_parser.add_argument("games")
+    extract_parser.add_argument("out", help=".npz file to write")
+    extract_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    extract_parser.set_defaults(handler=extract)
+
+    fit_parser = subparsers.add_parser("fit", help="fit the weights to an extracted feature matrix")
+    fit_parser.add_argument("features", help=".npz file written by extract")
+    fit_parser.add_argument("--out", default=WEIGHTS_FILE)
+    fit_parser.add_argument("--epochs", type=int, default=50)
+    fit_parser.add_argument("--batch-size", type=int, default=65536)
+    fit_parser.add_argument("--learning-rate", type=float, default=0.01)
+    fit_parser.add_argument("--seed", type=int, default=0)
+    fit_parser.set_defaults(handler=fit)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == '__main__':
+    main()
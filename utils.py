@@ -1,3 +1,5 @@
+from itertools import islice
+
 def get_position_with_row_col(row, column):
     # Receives a piece's row and column positions and returns the (0-31) position on the board.
     # Position is calculated taking into consideration the fact that each leftmost dark square on the board is (row * 4).
@@ -32,4 +34,14 @@ def get_piece_gui_coords(coords, square_dist, top_left_coords):
 
 def get_surface_mouse_offset(surface_pos, mouse_pos):
     # Receives the position (x, y) of a surface and the mouse. Returns the offset used to determine where the surface was clicked.
-    return (surface_pos[0] - mouse_pos[0], surface_pos[1] - mouse_pos[1])
\ No newline at end of file
+    return (surface_pos[0] - mouse_pos[0], surface_pos[1] - mouse_pos[1])
+
+def batched(iterable, size):
+    # Generator that yields lists of up to size items from an iterable.
+    # multiprocessing.Pool reads its whole input up front, so streams (e.g. games from a PDN file) are handed to it one batch at a time.
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch